@@ -152,6 +152,23 @@ _C.MODEL.FPN.NORM = ""
 # Types for fusing the FPN top-down and lateral features. Can be either "sum" or "avg"
 _C.MODEL.FPN.FUSE_TYPE = "sum"
 
+# Whether to run the FPN backbone (and its bottom-up network) in channels-last
+# (NHWC) memory format, which is usually faster for the convs on Tensor-Core GPUs.
+_C.MODEL.FPN.CHANNELS_LAST = False
+
+# Whether to run the FPN backbone under fp16 autocast on GPU at inference, which halves
+# the memory traffic of its feature maps. Outputs are cast back to fp32.
+# Inference only: training the backbone in fp16 without loss scaling is unsafe, so this is
+# ignored in training mode. Use SOLVER.AMP.ENABLED (with its GradScaler) to train with AMP.
+_C.MODEL.FPN.AMP = False
+
+# If non-empty, compile the FPN backbone with nn.Module.compile (PyTorch >= 2.2)
+# in this mode, e.g. "default", "max-autotune" or "reduce-overhead".
+# Input sizes vary per batch (each batch is padded to its own max size), so shapes are
+# compiled as dynamic. "reduce-overhead" still records a CUDA graph per distinct input
+# size, so it is best used with fixed-size inputs.
+_C.MODEL.FPN.COMPILE = ""
+
 
 # ---------------------------------------------------------------------------- #
 # Proposal generator options
@@ -4,6 +4,6 @@ from .build import build_backbone, BACKBONE_REGISTRY  # noqa F401 isort:skip
 from .backbone import Backbone
 from .fpn import FPN
 from .resnet import ResNet, ResNetBlockBase, build_resnet_backbone, make_stage
-# from .ftt import FTT
+from .ftt import FTT
 __all__ = [k for k in globals().keys() if not k.startswith("_")]
 # TODO can expose more resnet blocks after careful consideration
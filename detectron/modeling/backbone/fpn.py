@@ -1,5 +1,6 @@
 # Copyright (c) Facebook, Inc. and its affiliates.
 import math
+from typing import Dict
 import fvcore.nn.weight_init as weight_init
 import torch.nn.functional as F
 import torch 
@@ -11,7 +12,7 @@ from .backbone import Backbone
 from .build import BACKBONE_REGISTRY
 from .resnet import build_resnet_backbone
 
-from .ftt import FTT_get_p3pr
+from .ftt import FTT
 
 __all__ = ["build_resnet_fpn_backbone", 
             "FPN"]
@@ -24,7 +25,15 @@ class FPN(Backbone):
     """
 
     def __init__(
-        self, bottom_up, in_features, out_channels, norm="", top_block=None, fuse_type="sum"
+        self,
+        bottom_up,
+        in_features,
+        out_channels,
+        norm="",
+        top_block=None,
+        fuse_type="sum",
+        channels_last=False,
+        amp=False,
     ):
         """
         Args:
@@ -48,6 +57,14 @@ class FPN(Backbone):
             fuse_type (str): types for fusing the top down features and the lateral
                 ones. It can be "sum" (default), which sums up element-wise; or "avg",
                 which takes the element-wise mean of the two.
+            channels_last (bool): if True, keep the weights of this module (including
+                `bottom_up`) and the input images in channels-last (NHWC) memory format,
+                which lets cuDNN pick Tensor-Core friendly kernels for the convs.
+            amp (bool): if True, run the whole backbone (bottom-up and top-down) under
+                fp16 autocast on CUDA inputs in eval mode, and return fp32 features.
+                Inference only: it has no effect in training mode, where fp16 gradients
+                would need loss scaling, nor when the caller already enabled autocast
+                (e.g. :class:`AMPTrainer`).
         """
         #print("\n\n CONFIRMING THAT NEW FPN IS PRINTED\n\n")
         super(FPN, self).__init__()
@@ -100,12 +117,12 @@ class FPN(Backbone):
         
         # Place convs into top-down order (from low to high resolution)
         # to make the top-down computation in forward clearer.
-        self.out_channels = out_channels
-        self.norm = norm
         self.lateral_convs = lateral_convs[::-1]
         self.output_convs = output_convs[::-1]
         self.top_block = top_block
         self.in_features = in_features
+        # in_features in top-down order, cached so forward doesn't rebuild it every call
+        self._in_features_rev = tuple(in_features[::-1])
         self.bottom_up = bottom_up
         # Return feature names are "p<stage>", like ["p2", "p3", ..., "p6"]
         self._out_feature_strides = {"p{}".format(int(math.log2(s))): s for s in strides}
@@ -120,42 +137,26 @@ class FPN(Backbone):
 
         self._out_features = list(self._out_feature_strides.keys())
         self._out_feature_channels = {k: out_channels for k in self._out_features}
-        # self.ftt = FTT(self, ['p2', 'p3'], out_channels)
+        self.ftt = FTT(out_channels)
         #print(self._out_feature_channels) -> {'p2': 256, 'p3': 256, 'p4': 256, 'p5': 256, 'p6': 256, 'p7': 256}
         self._size_divisibility = strides[-1]
         assert fuse_type in {"avg", "sum"}
         self._fuse_type = fuse_type
-
-
-        # tuple of (conv2d, conv2d, iter)
-        def create_convs(num_channels, iter=3):
-            conv1 = Conv2d(
-            num_channels,
-            num_channels,
-            kernel_size=1,
-            bias=False,
-            norm=get_norm(norm, num_channels),
-            )
-
-            conv2 = Conv2d(
-            num_channels,
-            num_channels,
-            kernel_size=1,
-            bias=False,
-            norm=get_norm(norm, num_channels),
-            )
-            return (conv1, conv2, iter)
-    
+        # "avg" fusion is the sum scaled by 1/2, applied inside _upsample_add
+        self._fuse_scale = 0.5 if fuse_type == "avg" else 1.0
+        self._channels_last = channels_last
+        self._amp = amp
+        if channels_last:
+            self.to(memory_format=torch.channels_last)
 
     @property
     def size_divisibility(self):
         return self._size_divisibility
 
-    def forward(self, x):
+    def forward(self, x: torch.Tensor) -> Dict[str, torch.Tensor]:
         """
         Args:
-            input (dict[str->Tensor]): mapping feature map name (e.g., "res5") to
-                feature map tensor for each feature level in high to low resolution order.
+            x (Tensor): batched input images of shape (N, C, H, W), fed to `bottom_up`.
 
         Returns:
             dict[str->Tensor]:
@@ -164,6 +165,17 @@ class FPN(Backbone):
                 paper convention: "p<stage>", where stage has stride = 2 ** stage e.g.,
                 ["p2", "p3", ..., "p6"].
         """
+        # fp16 autocast without a GradScaler is only safe when there is no backward pass
+        if self._amp and not self.training and x.is_cuda and not torch.is_autocast_enabled():
+            from torch.cuda.amp import autocast
+
+            with autocast():
+                ret = self._forward(x)
+            # the heads consuming these features may not run under autocast
+            return {k: v.float() for k, v in ret.items()}
+        return self._forward(x)
+
+    def _forward(self, x: torch.Tensor) -> Dict[str, torch.Tensor]:
         # Reverse feature maps into top-down order (from low to high resolution)
         
         # x.shape = torch.Size([2, 3, 832, 1216]), where 2 is the batch size
@@ -171,23 +183,19 @@ class FPN(Backbone):
 
         #print("\nshape of feature map: ",x.shape,"\n\n")
 
+        if self._channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
         bottom_up_features = self.bottom_up(x)
-        x = [bottom_up_features[f] for f in self.in_features[::-1]]
+        x = [bottom_up_features[f] for f in self._in_features_rev]
         results = []
         prev_features = self.lateral_convs[0](x[0])
         results.append(self.output_convs[0](prev_features))
-        for features, lateral_conv, output_conv in zip(
-            x[1:], self.lateral_convs[1:], self.output_convs[1:]
-        ):
-            top_down_features = F.interpolate(prev_features, scale_factor=2, mode="nearest")
-            lateral_features = lateral_conv(features)
-            # print("\nlateral conv: ",type(lateral_conv),"\n",lateral_conv,"\n---\n")
-            # print("\ntop down features: ",type(top_down_features), "\n", top_down_features.shape,"\n----\n")
-            # print("\nlateral features: ",type(lateral_features), "\n", lateral_features.shape,"\n----\n")
-            prev_features = lateral_features + top_down_features
-            if self._fuse_type == "avg":
-                prev_features /= 2
-            results.insert(0, output_conv(prev_features))
+        for i in range(1, len(x)):
+            lateral_features = self.lateral_convs[i](x[i])
+            prev_features = _upsample_add(prev_features, lateral_features, self._fuse_scale)
+            results.append(self.output_convs[i](prev_features))
+        # results were collected top-down; return them in high to low resolution order
+        results.reverse()
 
         if self.top_block is not None:
             top_block_in_feature = bottom_up_features.get(self.top_block.in_feature, None)
@@ -197,12 +205,11 @@ class FPN(Backbone):
         assert len(self._out_features) == len(results)
         ret = dict(zip(self._out_features, results))
 
-        p3_p = FTT_get_p3pr(ret['p3'], ret['p4'], self.out_channels, self.norm)
-        # p2_p is p3_p upsampled by 2
-        p3_p = F.interpolate(p3_p, scale_factor=2, mode="nearest")
+        p3_p = self.ftt(ret['p3'], ret['p4'])
         # the final lateral_features at the end of the loop is c2_p
         c2_p = lateral_features
-        p2_p = p3_p + c2_p 
+        # p2_p is p3_p upsampled by 2, plus c2_p
+        p2_p = _upsample_add(p3_p, c2_p)
 
         ret['p2'] = p2_p       
 
@@ -217,6 +224,35 @@ class FPN(Backbone):
         }
 
 
+@torch.jit.script
+def _upsample_add(
+    top_down: torch.Tensor, lateral: torch.Tensor, scale: float = 1.0
+) -> torch.Tensor:
+    """
+    Equivalent to ``(lateral + F.interpolate(top_down, scale_factor=2, mode="nearest")) * scale``,
+    but the upsampled tensor is never materialized: `lateral` is viewed as 2x2 blocks and
+    each block gets its `top_down` pixel broadcast-added in the same pass.
+    The result has the memory format of `lateral` (NCHW-contiguous or channels-last).
+    Scripted so the top-down merge runs as one graph instead of separate Python-dispatched ops.
+    """
+    N, C, H, W = top_down.shape
+    if lateral.is_contiguous(memory_format=torch.channels_last):
+        # Do the block add on the NHWC data, so that the view of `lateral` needs no copy
+        # and the result stays channels-last.
+        out = (
+            lateral.permute(0, 2, 3, 1).reshape(N, H, 2, W, 2, C)
+            + top_down.permute(0, 2, 3, 1)[:, :, None, :, None, :]
+        )
+        if scale != 1.0:
+            out.mul_(scale)
+        return out.reshape(N, 2 * H, 2 * W, C).permute(0, 3, 1, 2)
+    out = lateral.reshape(N, C, H, 2, W, 2) + top_down[:, :, :, None, :, None]
+    if scale != 1.0:
+        # in place: the sum is a fresh buffer, and add does not save it for backward
+        out.mul_(scale)
+    return out.reshape(N, C, 2 * H, 2 * W)
+
+
 def _assert_strides_are_log2_contiguous(strides):
     """
     Assert that each stride is 2x times its preceding stride, i.e. "contiguous in log2".
@@ -262,5 +298,15 @@ def build_resnet_fpn_backbone(cfg, input_shape: ShapeSpec):
         norm=cfg.MODEL.FPN.NORM,
         top_block=LastLevelMaxPool(),
         fuse_type=cfg.MODEL.FPN.FUSE_TYPE,
+        channels_last=cfg.MODEL.FPN.get("CHANNELS_LAST", False),
+        amp=cfg.MODEL.FPN.get("AMP", False),
     )
+    compile_mode = cfg.MODEL.FPN.get("COMPILE", "")
+    if compile_mode:
+        assert hasattr(nn.Module, "compile"), "MODEL.FPN.COMPILE requires PyTorch >= 2.2!"
+        # nn.Module.compile compiles the module in place, so the backbone stays an FPN
+        # (a Backbone) with its size_divisibility and output_shape.
+        # Shapes are left dynamic: ImageList pads each batch only to its own max size,
+        # so with multi-scale / mixed aspect ratio inputs the padded size changes per batch.
+        backbone.compile(mode=compile_mode)
     return backbone
\ No newline at end of file
@@ -1,107 +1,89 @@
-import logging
-import numpy as np
-import fvcore.nn.weight_init as weight_init
 import torch
 import torch.nn.functional as F
 from torch import nn
 
-from detectron.layers import Conv2d, ShapeSpec, get_norm
-
-import math
-
-from .backbone import Backbone
-from .build import BACKBONE_REGISTRY
-from .resnet import build_resnet_backbone
-
-
-# p2, p3 in the paper is p3, p4 for us 
-# format of p2, p3 is both [bs, channels, height, width]
-def FTT_get_p3pr(p2, p3, out_channels, norm):
-    channel_scaler = Conv2d(
-        out_channels,
-        out_channels * 4,
-        kernel_size=1,
-        bias=False
-        #norm=''
-    )
-
-    # tuple of (conv2d, conv2d, iter)
-    def create_content_extractor(x, num_channels, iterations=3):
-        conv1 = Conv2d(
-        num_channels,
-        num_channels,
-        kernel_size=1,
-        bias=False,
-        #norm=get_norm(norm, num_channels),
-        )
-
-        conv2 = Conv2d(
-        num_channels,
-        num_channels,
-        kernel_size=1,
-        bias=False,
-        #norm=get_norm(norm, num_channels),
-        )
-
-        out = x
-        for i in range(iterations):
-            out = conv1(out)
-            out = F.relu_(out)
-            out = conv2(out)
-            out = F.relu_(out)
-
-        return out
-
-    def create_texture_extractor(x, num_channels, iterations=3):
-        conv1 = Conv2d(
-        num_channels,
-        num_channels,
-        kernel_size=1,
-        bias=False,
-        #norm=get_norm(norm, num_channels),
-        )
-
-        conv2 = Conv2d(
-        num_channels,
-        num_channels,
-        kernel_size=1,
-        bias=False,
-        #norm=get_norm(norm, num_channels),
-        )
-
-        conv3 = Conv2d(
-        num_channels,
-        int(num_channels/2),
-        kernel_size=1,
-        bias=False,
-        )
-
-        out = x
-        for i in range(iterations):
-            out = conv1(out)
-            out = F.relu_(out)
-            out = conv2(out)
-            out = F.relu_(out)
-        out = conv3(out)
-        out = F.relu_(out)
-        return out
-
-
-    bottom = p3
-    bottom = channel_scaler(bottom)
-    bottom = create_content_extractor(bottom, out_channels*4)
-    sub_pixel_conv = nn.PixelShuffle(2)
-    bottom = sub_pixel_conv(bottom)
-    #print("\np3 shape: ",bottom.shape,"\n")
-
-    # We interpreted "wrap" as concatenating bottom and top
-    # so the total channels is doubled after (basically place one on top
-    # of the other)
-    top = p2
-    top = torch.cat((bottom, top), axis=1)
-    top = create_texture_extractor(top, out_channels*2)
-    #top = top[:,256:]
-
-    result = bottom + top
-
-    return result
+from detectron.layers import Conv2d
+
+
+class Extractor(nn.Module):
+    """
+    The content / texture extractor of FTT: `iterations` rounds of
+    (1x1 conv -> relu -> 1x1 conv -> relu), optionally followed by a 1x1 conv + relu
+    that changes the number of channels.
+    """
+
+    def __init__(self, num_channels, out_channels=None, iterations=3, in_channels=None):
+        """
+        Args:
+            num_channels (int): number of channels kept by the repeated convs.
+            out_channels (int or None): if given, a final 1x1 conv projects the
+                features to this many channels.
+            iterations (int): number of (conv, conv) rounds. Every round has its own
+                weights.
+            in_channels (int or None): number of input channels, if different from
+                `num_channels`. The first conv then maps it to `num_channels`.
+        """
+        super().__init__()
+        if in_channels is None:
+            in_channels = num_channels
+        layers = [
+            Conv2d(
+                in_channels if i == 0 else num_channels,
+                num_channels,
+                kernel_size=1,
+                bias=False,
+                activation=F.relu_,
+            )
+            for i in range(2 * iterations)
+        ]
+        if out_channels is not None:
+            layers.append(
+                Conv2d(num_channels, out_channels, kernel_size=1, bias=False, activation=F.relu_)
+            )
+        # a flat chain of conv+relu layers, so the whole extractor is visible as one
+        # straight-line graph to tracing / scripting.
+        self.layers = nn.Sequential(*layers)
+
+    def forward(self, x):
+        return self.layers(x)
+
+
+class FTT(nn.Module):
+    """
+    The feature texture transfer (FTT) module of EFPN. It super-resolves the coarser of
+    two adjacent FPN levels by 2x and adds texture details extracted from the finer level.
+    """
+
+    def __init__(self, channels):
+        """
+        Args:
+            channels (int): number of channels of both input feature maps and of the output.
+        """
+        super().__init__()
+        # The channel scaler (C -> 4C 1x1 conv) is folded into the first conv of the
+        # content extractor: two 1x1 convs with no norm or nonlinearity in between
+        # compose to a single 1x1 conv.
+        self.content_extractor = Extractor(channels * 4, in_channels=channels)
+        self.texture_extractor = Extractor(channels * 2, channels)
+
+    def forward(self, p2, p3):
+        """
+        p2, p3 in the paper is p3, p4 for us.
+
+        Args:
+            p2 (Tensor): the finer feature map, of shape (N, C, 2H, 2W).
+            p3 (Tensor): the coarser feature map, of shape (N, C, H, W).
+
+        Returns:
+            Tensor: the super-resolved feature map p3', of shape (N, C, 2H, 2W).
+        """
+        bottom = self.content_extractor(p3)
+        # sub-pixel convolution: (N, 4C, H, W) -> (N, C, 2H, 2W)
+        bottom = F.pixel_shuffle(bottom, 2)
+
+        # We interpreted "wrap" as concatenating bottom and top
+        # so the total channels is doubled after (basically place one on top
+        # of the other)
+        top = torch.cat([bottom, p2], dim=1)
+        top = self.texture_extractor(top)
+        return bottom + top
@@ -155,11 +155,7 @@ class FPN(Backbone):
             results.extend(self.top_block(top_block_in_feature))
         assert len(self._out_features) == len(results)
         ret = dict(zip(self._out_features, results))
-        print("\nret1: ")
-        print(ret, '\n', '-----------', '\n\n')
         ret['p3\''] = self.ftt.forward(ret)
-        print("\nret2: ")
-        print(ret,'---\n')
         return ret
 
     def output_shape(self):
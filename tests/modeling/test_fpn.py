@@ -0,0 +1,140 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+import unittest
+from unittest import mock
+import torch
+import torch.nn.functional as F
+from torch import nn
+
+from detectron.layers import ShapeSpec
+from detectron.modeling.backbone import Backbone
+from detectron.modeling.backbone.fpn import (
+    FPN,
+    LastLevelMaxPool,
+    _upsample_add,
+    build_resnet_fpn_backbone,
+)
+from detectron.modeling.backbone.ftt import FTT
+from detectron2.config import get_cfg
+
+
+class _StubBottomUp(Backbone):
+    """
+    A bottom-up network producing res2-res6 (strides 4-64) from pooled images.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._out_features = ["res2", "res3", "res4", "res5", "res6"]
+        self._out_feature_strides = {f: 2 ** (i + 2) for i, f in enumerate(self._out_features)}
+        self._out_feature_channels = {f: 4 * (i + 1) for i, f in enumerate(self._out_features)}
+        self.convs = nn.ModuleList(
+            [nn.Conv2d(3, self._out_feature_channels[f], 1) for f in self._out_features]
+        )
+
+    def forward(self, x):
+        return {
+            f: conv(F.avg_pool2d(x, self._out_feature_strides[f]))
+            for f, conv in zip(self._out_features, self.convs)
+        }
+
+
+class TestUpsampleAdd(unittest.TestCase):
+    def _reference(self, top_down, lateral, scale):
+        return (lateral + F.interpolate(top_down, scale_factor=2, mode="nearest")) * scale
+
+    def test_matches_interpolate(self):
+        top_down = torch.rand(2, 4, 5, 7)
+        lateral = torch.rand(2, 4, 10, 14)
+        for scale in [1.0, 0.5]:
+            out = _upsample_add(top_down, lateral, scale)
+            self.assertEqual(out.shape, (2, 4, 10, 14))
+            self.assertTrue(torch.allclose(out, self._reference(top_down, lateral, scale)))
+
+    def test_channels_last(self):
+        top_down = torch.rand(2, 4, 5, 7)
+        lateral = torch.rand(2, 4, 10, 14).contiguous(memory_format=torch.channels_last)
+        for scale in [1.0, 0.5]:
+            out = _upsample_add(top_down, lateral, scale)
+            self.assertTrue(out.is_contiguous(memory_format=torch.channels_last))
+            self.assertTrue(torch.allclose(out, self._reference(top_down, lateral, scale)))
+
+
+class TestFTT(unittest.TestCase):
+    def test_output_shape(self):
+        N, C, H, W = 2, 8, 6, 10
+        ftt = FTT(C)
+        p2 = torch.rand(N, C, 2 * H, 2 * W)
+        p3 = torch.rand(N, C, H, W)
+        out = ftt(p2, p3)
+        self.assertEqual(out.shape, (N, C, 2 * H, 2 * W))
+        self.assertGreater(len(list(ftt.parameters())), 0)
+
+
+class TestFPN(unittest.TestCase):
+    def _build_fpn(self, fuse_type="sum"):
+        torch.manual_seed(0)
+        return FPN(
+            bottom_up=_StubBottomUp(),
+            in_features=["res2", "res3", "res4", "res5", "res6"],
+            out_channels=8,
+            top_block=LastLevelMaxPool(),
+            fuse_type=fuse_type,
+        )
+
+    def test_forward(self):
+        fpn = self._build_fpn()
+        images = torch.rand(2, 3, 128, 256)
+        with torch.no_grad():
+            ret = fpn(images)
+            features = fpn.bottom_up(images)
+            lat6 = fpn.lateral_convs[0](features["res6"])
+            lat5 = fpn.lateral_convs[1](features["res5"])
+            c2_lateral = fpn.lateral_convs[-1](features["res2"])
+            expected_p6 = fpn.output_convs[0](lat6)
+            expected_p5 = fpn.output_convs[1](_upsample_add(lat6, lat5))
+            expected_p2 = _upsample_add(fpn.ftt(ret["p3"], ret["p4"]), c2_lateral)
+
+        self.assertEqual(list(ret.keys()), ["p2", "p3", "p4", "p5", "p6", "p7"])
+        output_shape = fpn.output_shape()
+        for name, feature in ret.items():
+            stride = output_shape[name].stride
+            self.assertEqual(feature.shape, (2, 8, 128 // stride, 256 // stride))
+        self.assertTrue(torch.allclose(ret["p6"], expected_p6))
+        self.assertTrue(torch.allclose(ret["p5"], expected_p5))
+        self.assertTrue(torch.allclose(ret["p2"], expected_p2))
+
+
+    def test_avg_fuse(self):
+        fpn = self._build_fpn(fuse_type="avg")
+        images = torch.rand(2, 3, 128, 256)
+        with torch.no_grad():
+            ret = fpn(images)
+            features = fpn.bottom_up(images)
+            lat6 = fpn.lateral_convs[0](features["res6"])
+            lat5 = fpn.lateral_convs[1](features["res5"])
+            merged = (lat5 + F.interpolate(lat6, scale_factor=2, mode="nearest")) / 2
+            expected_p5 = fpn.output_convs[1](merged)
+        self.assertTrue(torch.allclose(ret["p5"], expected_p5))
+
+
+    @unittest.skipIf(not hasattr(nn.Module, "compile"), "Requires PyTorch >= 2.2")
+    def test_compile(self):
+        cfg = get_cfg()
+        cfg.MODEL.FPN.IN_FEATURES = ["res2", "res3", "res4", "res5", "res6"]
+        cfg.MODEL.FPN.OUT_CHANNELS = 8
+        cfg.MODEL.FPN.COMPILE = "default"
+        with mock.patch(
+            "detectron.modeling.backbone.fpn.build_resnet_backbone",
+            return_value=_StubBottomUp(),
+        ):
+            fpn = build_resnet_fpn_backbone(cfg, ShapeSpec(channels=3))
+        self.assertIsInstance(fpn, FPN)
+        # batches padded to different sizes must all run
+        for H, W in [(128, 256), (192, 128)]:
+            with torch.no_grad():
+                ret = fpn(torch.rand(1, 3, H, W))
+            self.assertEqual(ret["p2"].shape, (1, 8, H // 4, W // 4))
+
+
+if __name__ == "__main__":
+    unittest.main()